@@ -16,9 +16,18 @@ import json
 import sys
 
 
+_out = sys.stdout.buffer
+_write = _out.write
+
+
 def send_command(cmd: dict) -> None:
-    """Send a JSON command to par-term."""
-    print(json.dumps(cmd), flush=True)
+    """Queue a JSON command for par-term. Call flush() to send it."""
+    _write(json.dumps(cmd, separators=(",", ":")).encode() + b"\n")
+
+
+def flush() -> None:
+    """Send all queued commands to par-term in one write."""
+    _out.flush()
 
 
 def log(level: str, message: str) -> None:
@@ -40,6 +49,8 @@ def main() -> None:
     log("info", "Hello Observer script started")
     set_panel("Observer", "## Hello Observer\n- Status: Running\n- Events: 0")
 
+    flush()
+
     event_count = 0
     for line in sys.stdin:
         line = line.strip()
@@ -49,6 +60,7 @@ def main() -> None:
             event = json.loads(line)
         except json.JSONDecodeError as e:
             log("error", f"Invalid JSON: {e}")
+            flush()
             continue
 
         event_count += 1
@@ -77,7 +89,11 @@ def main() -> None:
                     f"{cmd_text} exited with code {exit_code}",
                 )
 
+        # One write per event, however many commands it produced
+        flush()
+
     log("info", "Hello Observer script shutting down")
+    flush()
 
 
 if __name__ == "__main__":
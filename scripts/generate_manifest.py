@@ -5,31 +5,64 @@ Usage:
     python scripts/generate_manifest.py shaders/
 
 This scans the shaders directory and generates a manifest.json
-with SHA256 hashes for all files.
+with SHA256 hashes for all files. Hashes are cached in
+.manifest_cache.json and only recomputed for files whose size or
+mtime changed; delete that file to force a full rehash.
 """
 
 import hashlib
 import json
+import mmap
+import os
+import re
 import sys
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 
+# orjson writes the manifest several times faster; fall back to json if absent
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Files at least this large are hashed through mmap instead of read()
+MMAP_THRESHOLD = 1 << 20
+
+# Sidecar cache of per-file hashes, keyed by size and mtime. Dotfiles are
+# excluded from the manifest, so it never lists itself.
+CACHE_NAME = ".manifest_cache.json"
+
+
+_TYPE_BY_SUFFIX = {
+    ".glsl": "shader",
+    ".png": "texture",
+    ".jpg": "texture",
+    ".jpeg": "texture",
+    ".webp": "texture",
+    ".gif": "texture",
+    ".md": "doc",
+    ".txt": "doc",
+    ".rst": "doc",
+}
+
+# Background shader categories by name pattern, checked in order
+_CATEGORY_PATTERNS = [
+    ("retro", re.compile("crt|scanline|vhs|retro|8bit|pixel")),
+    ("space", re.compile("star|galaxy|nebula|space|cosmic")),
+    ("nature", re.compile("fire|water|cloud|rain|snow|ocean|wave|jellyfish")),
+    ("matrix", re.compile("matrix|digital|cyber|code")),
+    ("abstract", re.compile("plasma|fractal|noise|pattern|warp")),
+]
+
 
 def get_file_type(path: Path) -> str:
     """Determine file type from path."""
-    name = path.name.lower()
-    suffix = path.suffix.lower()
-
-    if suffix == ".glsl":
-        if name.startswith("cursor_"):
-            return "cursor_shader"
-        return "shader"
-    elif suffix in (".png", ".jpg", ".jpeg", ".webp", ".gif"):
-        return "texture"
-    elif suffix in (".md", ".txt", ".rst"):
-        return "doc"
-    else:
-        return "other"
+    file_type = _TYPE_BY_SUFFIX.get(path.suffix.lower(), "other")
+    if file_type == "shader" and path.name.lower().startswith("cursor_"):
+        return "cursor_shader"
+    return file_type
 
 
 def get_category(path: Path, file_type: str) -> str | None:
@@ -48,39 +81,63 @@ def get_category(path: Path, file_type: str) -> str | None:
     if file_type == "shader" and name.startswith("cubemap-"):
         return "cubemap"
 
-    # Categorize background shaders by name patterns
-    retro_keywords = ["crt", "scanline", "vhs", "retro", "8bit", "pixel"]
-    space_keywords = ["star", "galaxy", "nebula", "space", "cosmic"]
-    nature_keywords = ["fire", "water", "cloud", "rain", "snow", "ocean", "wave", "jellyfish"]
-    abstract_keywords = ["plasma", "fractal", "noise", "pattern", "warp"]
-    matrix_keywords = ["matrix", "digital", "cyber", "code"]
-
-    for kw in retro_keywords:
-        if kw in name:
-            return "retro"
-    for kw in space_keywords:
-        if kw in name:
-            return "space"
-    for kw in nature_keywords:
-        if kw in name:
-            return "nature"
-    for kw in matrix_keywords:
-        if kw in name:
-            return "matrix"
-    for kw in abstract_keywords:
-        if kw in name:
-            return "abstract"
+    for category, pattern in _CATEGORY_PATTERNS:
+        if pattern.search(name):
+            return category
 
     return "effects"
 
 
 def compute_sha256(path: Path) -> str:
-    """Compute SHA256 hash of file."""
-    hasher = hashlib.sha256()
+    """Compute SHA256 hash of file.
+
+    Must stay SHA-256: par-term-update's manifest.rs rehashes installed files
+    with SHA-256 and compares against the ``sha256`` field to detect edits.
+    """
     with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            hasher.update(chunk)
-    return hasher.hexdigest()
+        size = os.fstat(f.fileno()).st_size
+        if size < MMAP_THRESHOLD:
+            # Also covers empty files, which mmap rejects
+            return hashlib.sha256(f.read()).hexdigest()
+        # Hash large files (textures) straight from the page cache
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.sha256(mm).hexdigest()
+
+
+def iter_bundle_files(root: str | os.PathLike[str]) -> Iterator[os.DirEntry[str]]:
+    """Yield bundle files under root in sorted path order.
+
+    Dotfiles, hidden directories, and manifest.json are skipped by name
+    before any stat() call. Symlinked directories are not followed.
+    """
+    with os.scandir(root) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    for entry in entries:
+        if entry.name.startswith("."):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_bundle_files(entry.path)
+        elif entry.name != "manifest.json" and entry.is_file():
+            yield entry
+
+
+def load_hash_cache(path: Path) -> dict:
+    """Load the hash cache, mapping relative path to [size, mtime_ns, sha256]."""
+    try:
+        cache = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def write_manifest(path: Path, manifest: dict) -> None:
+    """Write manifest as 2-space indented JSON with a trailing newline."""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(manifest, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+        f.write("\n")
 
 
 def main() -> None:
@@ -103,19 +160,39 @@ def main() -> None:
                 version = line.split('"')[1]
                 break
 
-    files = []
-    for path in sorted(shaders_dir.rglob("*")):
-        if not path.is_file():
-            continue
+    candidates = []
+    stats = []
+    for entry in iter_bundle_files(shaders_dir):
+        path = Path(entry.path)
         relative = path.relative_to(shaders_dir)
-        if path.name == "manifest.json" or path.name.startswith(".") or any(part.startswith(".") for part in relative.parts):
-            continue
         file_type = get_file_type(path)
         category = get_category(path, file_type)
+        candidates.append((path, relative, file_type, category))
+        stats.append((entry.stat(), str(relative)))
+
+    # Reuse cached hashes for files whose size and mtime are unchanged
+    cache_path = shaders_dir / CACHE_NAME
+    cache = load_hash_cache(cache_path)
+    hashes: list[str | None] = []
+    for st, key in stats:
+        cached = cache.get(key)
+        if isinstance(cached, list) and len(cached) == 3 and cached[:2] == [st.st_size, st.st_mtime_ns]:
+            hashes.append(cached[2])
+        else:
+            hashes.append(None)
+    stale = [idx for idx, sha256 in enumerate(hashes) if sha256 is None]
+
+    # hashlib releases the GIL while hashing, so threads hash files in parallel.
+    # ex.map keeps results in submission order.
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
+        for idx, sha256 in zip(stale, ex.map(compute_sha256, (candidates[idx][0] for idx in stale))):
+            hashes[idx] = sha256
 
+    files = []
+    for (_, relative, file_type, category), sha256 in zip(candidates, hashes):
         entry = {
             "path": str(relative),
-            "sha256": compute_sha256(path),
+            "sha256": sha256,
             "type": file_type,
         }
         if category:
@@ -142,11 +219,15 @@ def main() -> None:
         except (OSError, json.JSONDecodeError, TypeError):
             pass
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(manifest, f, indent=2)
-        f.write("\n")
+    write_manifest(output_path, manifest)
+
+    new_cache = {key: [st.st_size, st.st_mtime_ns, sha256] for (st, key), sha256 in zip(stats, hashes)}
+    try:
+        cache_path.write_text(json.dumps(new_cache), encoding="utf-8")
+    except OSError as e:
+        print(f"Warning: could not write {cache_path}: {e}")
 
-    print(f"Generated {output_path} with {len(files)} files")
+    print(f"Generated {output_path} with {len(files)} files ({len(stale)} hashed)")
 
 
 if __name__ == "__main__":
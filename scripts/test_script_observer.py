@@ -45,18 +45,49 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import sys
 import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from heapq import nlargest
+from operator import itemgetter
+
+# orjson parses and serializes several times faster than the stdlib; it is
+# optional, so fall back to json when it isn't installed.
+try:
+    import orjson
+
+    loads = orjson.loads
+    dumps = orjson.dumps
+except ImportError:
+    loads = json.loads
+
+    def dumps(obj: object) -> bytes:
+        """Serialize ``obj`` as compact JSON bytes."""
+        return json.dumps(obj, separators=(",", ":")).encode()
 
 
 # ---------------------------------------------------------------------------
 # Protocol helpers
 # ---------------------------------------------------------------------------
 
+_out = sys.stdout.buffer
+_write = _out.write
+
+
 def send(cmd: dict) -> None:
-    """Send a JSON command to par-term (one line on stdout)."""
-    print(json.dumps(cmd), flush=True)
+    """Queue a JSON command for par-term (one line on stdout).
+
+    Commands are buffered until ``flush()``, which runs once per handled event.
+    """
+    _write(dumps(cmd) + b"\n")
+
+
+def flush() -> None:
+    """Write all queued commands to par-term."""
+    _out.flush()
 
 
 def log(level: str, message: str) -> None:
@@ -104,90 +135,232 @@ def change_config(key: str, value: object) -> None:
     send({"type": "ChangeConfig", "key": key, "value": value})
 
 
+def iter_lines_fd(fd: int = 0, bufsize: int = 1 << 16) -> Iterator[bytes]:
+    """Yield lines read straight from ``fd``, without their trailing newline.
+
+    Bypasses the text-IO layer: one ``os.read`` per chunk, no decoding and no
+    newline translation. A final unterminated line is yielded at EOF.
+    """
+    read = os.read
+    # Partial line carried across reads; only new chunks are scanned, so a long
+    # line without a newline costs linear time
+    pending = bytearray()
+    while chunk := read(fd, bufsize):
+        if b"\n" not in chunk:
+            pending += chunk
+            continue
+        lines = chunk.split(b"\n")
+        if pending:
+            pending += lines[0]
+            lines[0] = bytes(pending)
+            pending.clear()
+        pending += lines.pop()
+        yield from lines
+    if pending:
+        yield bytes(pending)
+
+
+# Shared by read_event() and event_stream() so neither loses lines the other
+# has already read from the fd.
+_stdin_lines = iter_lines_fd()
+
+
 def read_event() -> dict | None:
     """Read one JSON event from stdin. Returns None on EOF."""
-    line = sys.stdin.readline()
-    if not line:
-        return None
-    line = line.strip()
+    flush()
+    line = next(_stdin_lines, b"").strip()
     if not line:
         return None
-    return json.loads(line)
+    return loads(line)
 
 
 def event_stream():
-    """Yield events from stdin until EOF."""
-    for line in sys.stdin:
+    """Yield events from stdin until EOF.
+
+    Commands queued while the caller handles an event are flushed before the
+    next line is read.
+    """
+    flush()
+    for line in _stdin_lines:
         line = line.strip()
         if not line:
             continue
         try:
-            yield json.loads(line)
+            event = loads(line)
         except json.JSONDecodeError as e:
             log("error", f"Invalid JSON from terminal: {e}")
+        else:
+            yield event
+        flush()
 
 
 # ---------------------------------------------------------------------------
 # Modes
 # ---------------------------------------------------------------------------
 
+# Minimum seconds between routine monitor panel refreshes
+PANEL_MIN_INTERVAL = 0.1
+
+
+def noop(_data: dict, _state: object) -> None:
+    """Ignore an event."""
+
+
+@dataclass
+class MonitorState:
+    """Counters and last-seen values shown in the monitor panel."""
+
+    start_time: float = field(default_factory=time.monotonic)
+    event_count: int = 0
+    event_kinds: dict[str, int] = field(default_factory=dict)
+    last_cwd: str = "?"
+    last_title: str = "?"
+    errors: int = 0
+    last_panel: float = 0.0
+
+
+def monitor_cwd_changed(data: dict, state: MonitorState) -> None:
+    """Record the new CWD and log it."""
+    state.last_cwd = data.get("cwd", "?")
+    log("info", f"CWD -> {state.last_cwd}")
+
+
+def monitor_title_changed(data: dict, state: MonitorState) -> None:
+    """Record the new window title."""
+    state.last_title = data.get("title", "?")
+
+
+def monitor_command_complete(data: dict, state: MonitorState) -> None:
+    """Count and log a failed command."""
+    cmd = data.get("command", "")
+    code = data.get("exit_code")
+    if code is not None and code != 0:
+        state.errors += 1
+        log("warn", f"Command failed: {cmd} (exit {code})")
+
+
+def monitor_bell_rang(_data: dict, _state: MonitorState) -> None:
+    """Log the bell."""
+    log("info", "Bell rang")
+
+
+MONITOR_HANDLERS: dict[str, Callable[[dict, MonitorState], None]] = {
+    "cwd_changed": monitor_cwd_changed,
+    "title_changed": monitor_title_changed,
+    "command_complete": monitor_command_complete,
+    "bell_rang": monitor_bell_rang,
+}
+
+
+def update_monitor_panel(state: MonitorState) -> None:
+    """Send the monitor status panel."""
+    elapsed = time.monotonic() - state.start_time
+    rate = state.event_count / elapsed if elapsed > 0 else 0.0
+    top_kinds = nlargest(5, state.event_kinds.items(), key=itemgetter(1))
+    kind_lines = "\n".join(f"  - `{k}`: {c}" for k, c in top_kinds)
+    content = (
+        f"## Monitor\n"
+        f"- **Events**: {state.event_count} ({rate:.1f}/s)\n"
+        f"- **Errors**: {state.errors}\n"
+        f"- **CWD**: `{state.last_cwd}`\n"
+        f"- **Title**: {state.last_title}\n"
+        f"- **Top events**:\n{kind_lines}\n"
+    )
+    set_panel("Monitor", content)
+
+
 def mode_monitor(args: argparse.Namespace) -> None:
     """Log all events and maintain a live status panel."""
     log("info", "Monitor mode started")
 
-    event_count = 0
-    event_kinds: dict[str, int] = {}
-    last_cwd = "?"
-    last_title = "?"
-    errors = 0
-    start_time = time.monotonic()
-
-    def update_panel() -> None:
-        elapsed = time.monotonic() - start_time
-        rate = event_count / elapsed if elapsed > 0 else 0.0
-        top_kinds = sorted(event_kinds.items(), key=lambda x: -x[1])[:5]
-        kind_lines = "\n".join(f"  - `{k}`: {c}" for k, c in top_kinds)
-        content = (
-            f"## Monitor\n"
-            f"- **Events**: {event_count} ({rate:.1f}/s)\n"
-            f"- **Errors**: {errors}\n"
-            f"- **CWD**: `{last_cwd}`\n"
-            f"- **Title**: {last_title}\n"
-            f"- **Top events**:\n{kind_lines}\n"
-        )
-        set_panel("Monitor", content)
+    state = MonitorState()
+    event_kinds = state.event_kinds
+    handlers = MONITOR_HANDLERS
 
     for event in event_stream():
-        event_count += 1
+        state.event_count += 1
         kind = event.get("kind", "unknown")
         data = event.get("data", {})
         event_kinds[kind] = event_kinds.get(kind, 0) + 1
 
-        log("debug", f"[{event_count}] {kind}: {json.dumps(data)[:120]}")
-
-        match kind:
-            case "cwd_changed":
-                last_cwd = data.get("cwd", "?")
-                log("info", f"CWD -> {last_cwd}")
-            case "title_changed":
-                last_title = data.get("title", "?")
-            case "command_complete":
-                cmd = data.get("command", "")
-                code = data.get("exit_code")
-                if code is not None and code != 0:
-                    errors += 1
-                    log("warn", f"Command failed: {cmd} (exit {code})")
-            case "bell_rang":
-                log("info", "Bell rang")
-            case _:
-                pass
-
-        # Update panel every 5 events or immediately for important ones
-        if event_count % 5 == 0 or kind in ("cwd_changed", "command_complete", "bell_rang"):
-            update_panel()
-
-    update_panel()
-    log("info", f"Monitor ended after {event_count} events")
+        log("debug", f"[{state.event_count}] {kind}: {dumps(data)[:120].decode(errors='ignore')}")
+
+        handlers.get(kind, noop)(data, state)
+
+        # Update panel immediately for important events, otherwise at most
+        # once per PANEL_MIN_INTERVAL so bursts don't flood the script channel
+        now = time.monotonic()
+        if kind in ("cwd_changed", "command_complete", "bell_rang") or now - state.last_panel >= PANEL_MIN_INTERVAL:
+            update_monitor_panel(state)
+            state.last_panel = now
+
+    update_monitor_panel(state)
+    log("info", f"Monitor ended after {state.event_count} events")
+
+
+@dataclass
+class CommandState:
+    """State kept across events in command mode."""
+
+    failed_commands: list[str] = field(default_factory=list)
+
+
+def command_bell_rang(_data: dict, _state: CommandState) -> None:
+    """Send a desktop notification for the bell."""
+    notify("Bell", "Terminal bell was triggered")
+    log("info", "Sent notification for bell event")
+
+
+def command_cwd_changed(data: dict, _state: CommandState) -> None:
+    """Mirror the new CWD into a variable and the badge."""
+    cwd = data.get("cwd", "")
+    set_variable("last_cwd", cwd)
+    set_badge(cwd.split("/")[-1] or "/")
+    log("info", f"Updated badge and variable for CWD: {cwd}")
+
+
+def command_command_complete(data: dict, state: CommandState) -> None:
+    """Notify on failure and show the result in the badge."""
+    cmd = data.get("command", "")
+    code = data.get("exit_code")
+    if code is not None and code != 0:
+        state.failed_commands.append(f"{cmd} (exit {code})")
+        notify("Command Failed", f"`{cmd}` exited with code {code}")
+        set_badge(f"FAIL:{code}")
+        log("error", f"Command failed: {cmd} exit={code}")
+    elif cmd:
+        set_badge("OK")
+        log("info", f"Command succeeded: {cmd}")
+
+
+def command_title_changed(data: dict, _state: CommandState) -> None:
+    """Store the new title in a variable."""
+    title = data.get("title", "")
+    set_variable("last_title", title)
+
+
+def command_environment_changed(data: dict, _state: CommandState) -> None:
+    """Log the changed environment variable."""
+    key = data.get("key", "")
+    value = data.get("value", "")
+    log("info", f"Env changed: {key}={value[:50]}")
+
+
+def command_user_var_changed(data: dict, _state: CommandState) -> None:
+    """Log the changed user variable."""
+    name = data.get("name", "")
+    value = data.get("value", "")
+    log("info", f"User var: {name}={value}")
+
+
+COMMAND_HANDLERS: dict[str, Callable[[dict, CommandState], None]] = {
+    "bell_rang": command_bell_rang,
+    "cwd_changed": command_cwd_changed,
+    "command_complete": command_command_complete,
+    "title_changed": command_title_changed,
+    "environment_changed": command_environment_changed,
+    "user_var_changed": command_user_var_changed,
+}
 
 
 def mode_command(_args: argparse.Namespace) -> None:
@@ -195,51 +368,19 @@ def mode_command(_args: argparse.Namespace) -> None:
     log("info", "Command mode started - reacting to terminal events")
     set_badge("CMD")
 
-    failed_commands: list[str] = []
+    state = CommandState()
+    failed_commands = state.failed_commands
+    handlers = COMMAND_HANDLERS
 
     for event in event_stream():
         kind = event.get("kind", "unknown")
         data = event.get("data", {})
 
-        match kind:
-            case "bell_rang":
-                notify("Bell", "Terminal bell was triggered")
-                log("info", "Sent notification for bell event")
-
-            case "cwd_changed":
-                cwd = data.get("cwd", "")
-                set_variable("last_cwd", cwd)
-                set_badge(cwd.split("/")[-1] or "/")
-                log("info", f"Updated badge and variable for CWD: {cwd}")
-
-            case "command_complete":
-                cmd = data.get("command", "")
-                code = data.get("exit_code")
-                if code is not None and code != 0:
-                    failed_commands.append(f"{cmd} (exit {code})")
-                    notify("Command Failed", f"`{cmd}` exited with code {code}")
-                    set_badge(f"FAIL:{code}")
-                    log("error", f"Command failed: {cmd} exit={code}")
-                elif cmd:
-                    set_badge("OK")
-                    log("info", f"Command succeeded: {cmd}")
-
-            case "title_changed":
-                title = data.get("title", "")
-                set_variable("last_title", title)
-
-            case "environment_changed":
-                key = data.get("key", "")
-                value = data.get("value", "")
-                log("info", f"Env changed: {key}={value[:50]}")
-
-            case "user_var_changed":
-                name = data.get("name", "")
-                value = data.get("value", "")
-                log("info", f"User var: {name}={value}")
-
-            case _:
-                log("debug", f"Unhandled event: {kind}")
+        handler = handlers.get(kind)
+        if handler is None:
+            log("debug", f"Unhandled event: {kind}")
+        else:
+            handler(data, state)
 
         # Update panel with failure history
         if failed_commands:
@@ -278,6 +419,17 @@ def mode_stress(args: argparse.Namespace) -> None:
     log("info", f"Stress test complete: {count} events in {elapsed:.1f}s ({rate:.0f}/s)")
 
 
+# Fields each data_type must carry, and the issue reported when any is missing
+VALIDATE_REQUIRED_FIELDS: dict[str, tuple[tuple[str, ...], str]] = {
+    "CwdChanged": (("cwd",), "CwdChanged missing 'cwd' field"),
+    "CommandComplete": (("command",), "CommandComplete missing 'command' field"),
+    "TitleChanged": (("title",), "TitleChanged missing 'title' field"),
+    "SizeChanged": (("cols", "rows"), "SizeChanged missing 'cols' or 'rows'"),
+    "VariableChanged": (("name", "value"), "VariableChanged missing 'name' or 'value'"),
+    "EnvironmentChanged": (("key", "value"), "EnvironmentChanged missing 'key' or 'value'"),
+}
+
+
 def mode_validate(_args: argparse.Namespace) -> None:
     """Echo parsed event structure for protocol debugging."""
     log("info", "Validate mode started - echoing event structure")
@@ -302,25 +454,11 @@ def mode_validate(_args: argparse.Namespace) -> None:
         if "data_type" not in data:
             issues.append("missing 'data_type' in data")
 
-        match data_type:
-            case "CwdChanged":
-                if "cwd" not in data:
-                    issues.append("CwdChanged missing 'cwd' field")
-            case "CommandComplete":
-                if "command" not in data:
-                    issues.append("CommandComplete missing 'command' field")
-            case "TitleChanged":
-                if "title" not in data:
-                    issues.append("TitleChanged missing 'title' field")
-            case "SizeChanged":
-                if "cols" not in data or "rows" not in data:
-                    issues.append("SizeChanged missing 'cols' or 'rows'")
-            case "VariableChanged":
-                if "name" not in data or "value" not in data:
-                    issues.append("VariableChanged missing 'name' or 'value'")
-            case "EnvironmentChanged":
-                if "key" not in data or "value" not in data:
-                    issues.append("EnvironmentChanged missing 'key' or 'value'")
+        required = VALIDATE_REQUIRED_FIELDS.get(data_type)
+        if required is not None:
+            names, message = required
+            if any(name not in data for name in names):
+                issues.append(message)
 
         if issues:
             log("warn", f"Validation issues: {', '.join(issues)}")
@@ -445,6 +583,7 @@ def main() -> None:
         log("error", f"JSON decode error: {e}")
     finally:
         log("info", "test_script_observer exiting")
+        flush()
 
 
 if __name__ == "__main__":